@@ -0,0 +1,28 @@
+#
+# NEW FILE: face_cascade.py
+#
+# One process-wide Haar cascade instance, shared by the login and register
+# pages. Each page used to parse the ~900KB XML on its own; now whichever
+# page needs it first pays the parse once and everyone reuses it.
+#
+import os
+import cv2
+
+CASCADE_PATH = "assets/haarcascade_frontalface_default.xml"
+
+_FACE_DETECTOR = None
+
+def get_face_detector():
+    """
+    Lazily loads the Haar cascade classifier, once per process.
+
+    NOTE: OpenCV's Python bindings expose no CascadeClassifier.save, so a
+    preparsed binary FileStorage form of the cascade can't be produced from
+    here - caching the parsed classifier is what removes the repeat cost.
+    """
+    global _FACE_DETECTOR
+    if _FACE_DETECTOR is None:
+        if not os.path.exists(CASCADE_PATH):
+            raise FileNotFoundError(f"Haar cascade not found at {CASCADE_PATH}")
+        _FACE_DETECTOR = cv2.CascadeClassifier(CASCADE_PATH)
+    return _FACE_DETECTOR
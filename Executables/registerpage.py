@@ -6,7 +6,7 @@ import cv2
 import io
 import zipfile
 import requests
-import time
+from requests.adapters import HTTPAdapter, Retry
 import numpy as np
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
@@ -16,12 +16,75 @@ from PySide6.QtGui import QFont, QImage, QPixmap
 from PySide6.QtCore import Qt, QThread, QObject, Signal, Slot
 
 # [NEW] Import theme instead of hard-coding colors
-import theme 
+import theme
+# [PERF] Shared process-wide Haar cascade (parsed once for all pages)
+import face_cascade
 
 # [NEW] Path to your assets
-CASCADE_PATH = "assets/haarcascade_frontalface_default.xml"
 API_URL = "https://morsz.azeroth.site" # Your server URL
 
+# [PERF] Shared session: keep-alive skips the ~2-RTT TCP+TLS handshake on
+# retries and repeat registrations, and transient failures get two cheap
+# automatic retries on the pooled connection.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4,
+                                       max_retries=Retry(total=2, backoff_factor=0.3)))
+
+# [PERF] Optional libjpeg-turbo encoder for the 50 face-ROI JPEGs (SIMD
+# DCT/Huffman, 2-6x over stock libjpeg). The ROIs are single-channel, so the
+# grayscale fast path also skips the color-conversion shuffle that usually
+# hides turbo's speedup. Falls back to cv2.imencode when unavailable.
+try:
+    from turbojpeg import TurboJPEG, TJPF_GRAY, TJSAMP_GRAY
+    _TURBO_JPEG = TurboJPEG()
+except Exception:
+    _TURBO_JPEG = None
+
+# [PERF] Optional YuNet DNN face detector (int8 ONNX), same as loginpage:
+# OpenCV DNN runs it with int8 SIMD kernels, well ahead of Haar on frontal
+# faces. Only used if the model file has been dropped into assets.
+YUNET_PATH = "assets/face_detection_yunet_2023mar_int8.onnx"
+_YUNET = None
+
+# [PERF] Minimum aHash Hamming distance (out of 64 bits) between an accepted
+# ROI and everything accepted before it. Replaces the fixed 100ms sleep that
+# put a hard 5-second floor on collecting 50 images.
+MIN_HASH_DISTANCE = 12
+# [FIX] The diversity gate must never stall capture: after this many
+# consecutive rejections the next ROI is accepted unconditionally, so a
+# perfectly still user still makes progress (just with less varied images).
+MAX_REJECT_STREAK = 15
+
+def _ahash(face_roi):
+    """8x8 average-hash of a ROI as a flat boolean array (64 bits)."""
+    tiny = cv2.resize(face_roi, (8, 8), interpolation=cv2.INTER_AREA)
+    return (tiny > tiny.mean()).reshape(-1)
+
+def _create_tracker():
+    """Creates a KCF tracker if this OpenCV build ships one, else None."""
+    if hasattr(cv2, "TrackerKCF_create"):
+        return cv2.TrackerKCF_create()
+    if hasattr(cv2, "legacy") and hasattr(cv2.legacy, "TrackerKCF_create"):
+        return cv2.legacy.TrackerKCF_create()
+    return None
+
+def _get_yunet():
+    """Lazily create the YuNet detector, or return None if unavailable."""
+    global _YUNET
+    if _YUNET is None and hasattr(cv2, "FaceDetectorYN") and os.path.exists(YUNET_PATH):
+        _YUNET = cv2.FaceDetectorYN.create(YUNET_PATH, "", (320, 240),
+                                           score_threshold=0.7)
+    return _YUNET
+
+def _encode_roi(face_roi):
+    """Encodes one grayscale face ROI to JPEG bytes (None on failure)."""
+    if _TURBO_JPEG is not None:
+        return _TURBO_JPEG.encode(face_roi, quality=85,
+                                  pixel_format=TJPF_GRAY,
+                                  jpeg_subsample=TJSAMP_GRAY)
+    is_success, buffer = cv2.imencode(".jpg", face_roi)
+    return bytes(buffer) if is_success else None
+
 
 # [NEW] Worker thread for face registration
 # This now emits the video frame to be displayed
@@ -30,8 +93,10 @@ class FaceRegisterWorker(QObject):
     Runs face capture and network upload in a separate thread 
     to avoid freezing the GUI.
     """
-    # Signal(QImage, str) - emits (video_frame, status_text)
-    progress_frame = Signal(QImage, str)
+    # Signal(int, str) - emits (frame ring-slot index or -1, status_text)
+    # [PERF] The queued signal carries just a slot index instead of a QImage
+    # payload; the dialog wraps the slot's numpy buffer zero-copy.
+    progress_frame = Signal(int, str)
     # Signal(int) - emits percentage for progress bar
     progress_value = Signal(int)
     # Signal(bool, str) - emits (success, message)
@@ -43,87 +108,222 @@ class FaceRegisterWorker(QObject):
         self.camera_index = camera_index # Use the selected camera index
         self.images_to_capture = 50
         self._is_running = True
+        # [PERF] Detect every Nth frame and let a KCF tracker carry the bbox
+        # in between - the face moves a few pixels per frame at most. ROIs
+        # are only archived on real detection frames to keep training clean.
+        self._tracker = None
+        self._detect_every = 3
+        # [PERF] 2-slot frame ring shared with the dialog: alternating slots
+        # plus the _frame_pending ack keep the GUI reading one buffer while
+        # the worker publishes into the other.
+        self._slots = [None, None]
+        self._slot_idx = 0
+        # [PERF] Reused half-size detection buffers (allocated on first
+        # frame) - 30 FPS capture shouldn't churn the allocator with ~MB
+        # arrays every iteration.
+        self._small_color = None
+        self._small_gray = None
+        # [PERF] Drop-frame backpressure: True while the GUI still hasn't
+        # painted the last published preview frame. The dialog clears it.
+        self._frame_pending = False
+
+    def _detect_faces(self, frame_bgr):
+        """
+        Returns face bboxes as (x, y, w, h) in full-resolution coordinates.
+        Prefers the YuNet DNN detector; falls back to the Haar cascade.
+        """
+        yunet = _get_yunet()
+        if yunet is not None:
+            h, w = frame_bgr.shape[:2]
+            yunet.setInputSize((w, h))
+            _, dets = yunet.detect(frame_bgr)
+            if dets is None:
+                return ()
+            return dets[:, :4].astype(int)
+
+        # [PERF] Haar cost scales with pixel count: detect at half
+        # resolution (4x less work), then scale the bboxes back up so
+        # the archived ROI is still cropped at full resolution.
+        # Downscale in color first and gray only the result - running
+        # BGR->GRAY over the full ~1MP frame was a memory-bandwidth pass
+        # on pixels detection never looks at. All stages write into reused
+        # dst buffers.
+        h2, w2 = frame_bgr.shape[0] // 2, frame_bgr.shape[1] // 2
+        if self._small_gray is None or self._small_gray.shape != (h2, w2):
+            self._small_color = np.empty((h2, w2, 3), dtype=np.uint8)
+            self._small_gray = np.empty((h2, w2), dtype=np.uint8)
+        cv2.resize(frame_bgr, (w2, h2), dst=self._small_color,
+                   interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small_color, cv2.COLOR_BGR2GRAY, dst=self._small_gray)
+        # [PERF] Equalize only the small detection image - a few hundred us
+        # that noticeably helps Haar under uneven lighting. The archived ROI
+        # stays untouched; the server-side model normalizes for itself.
+        small = cv2.equalizeHist(self._small_gray, self._small_gray)
+        # [PERF] Only faces[0] is ever used, so there is no point enumerating
+        # candidates across the whole scale pyramid. A narrow min/maxSize band
+        # sized for a face at webcam registration distance (values halved to
+        # match the half-resolution detection image) collapses the pyramid
+        # from ~15 octaves to 3-4 - the cheapest Haar speedup there is.
+        faces = face_cascade.get_face_detector().detectMultiScale(
+            small, scaleFactor=1.15, minNeighbors=4,
+            minSize=(40, 40), maxSize=(150, 150))
+        if len(faces) == 0:
+            return ()
+        return [[v * 2 for v in f] for f in faces]
 
     @Slot()
     def run(self):
         """This is the function that runs in the new thread."""
         try:
-            if not os.path.exists(CASCADE_PATH):
-                raise FileNotFoundError(f"Haar cascade not found at {CASCADE_PATH}")
+            if _get_yunet() is None:
+                face_cascade.get_face_detector() # Fail fast if the cascade is missing
 
-            face_detector = cv2.CascadeClassifier(CASCADE_PATH)
-            
-            cap = cv2.VideoCapture(self.camera_index) 
+            cap = cv2.VideoCapture(self.camera_index)
             if not cap.isOpened():
                 raise IOError(f"Cannot open webcam at index {self.camera_index}.")
 
-            image_list = []
+            # [PERF] MJPG + 640x480: the camera compresses on its own ISP, so
+            # USB bandwidth drops ~5x and the driver skips the raw-YUV copy
+            # path. BUFFERSIZE=1 keeps reads on the freshest frame now that
+            # the capture loop no longer sleeps.
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            cap.set(cv2.CAP_PROP_FPS, 30)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            accepted_hashes = []
             count = 0
-            
+            frame_idx = 0
+            reject_streak = 0
+
+            # [PERF] Build the upload zip incrementally during capture: each
+            # accepted ROI is encoded and written immediately, so only one
+            # raw ROI ever exists at a time instead of 50 numpy arrays plus
+            # 50 JPEG buffers plus the finished zip at peak. The encode cost
+            # is also amortized across the loop, removing the post-capture
+            # stall before "Uploading...".
+            mem_zip = io.BytesIO()
+            zf = zipfile.ZipFile(mem_zip, 'w', zipfile.ZIP_STORED)
+
             while count < self.images_to_capture and self._is_running:
                 ret, frame = cap.read()
                 if not ret:
-                    self.progress_frame.emit(None, "Error: Can't read frame.")
+                    self.progress_frame.emit(-1, "Error: Can't read frame.")
                     break
-                
-                frame = cv2.flip(frame, 1)
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_detector.detectMultiScale(gray, 1.3, 5)
+
+                # [PERF] Flip straight into the ring slot that would be
+                # published next: no per-frame allocation, and the slot the
+                # GUI is currently reading is never written (the index only
+                # advances when a frame is actually published).
+                write_idx = self._slot_idx ^ 1
+                if (self._slots[write_idx] is None
+                        or self._slots[write_idx].shape != frame.shape):
+                    self._slots[write_idx] = np.empty_like(frame)
+                cv2.flip(frame, 1, dst=self._slots[write_idx])
+                frame = self._slots[write_idx]
+
+                frame_idx += 1
+                detect_now = (self._tracker is None
+                              or frame_idx % self._detect_every == 1)
+                if detect_now:
+                    faces = self._detect_faces(frame)
+                    if len(faces) > 0:
+                        tracker = _create_tracker()
+                        if tracker is not None:
+                            tracker.init(frame, tuple(int(v) for v in faces[0]))
+                            self._tracker = tracker
+                else:
+                    # Cheap tracker update instead of a full detect pass.
+                    ok, box = self._tracker.update(frame)
+                    if ok:
+                        faces = [tuple(int(v) for v in box)]
+                    else:
+                        faces = ()
+                        self._tracker = None
 
                 status_text = "Looking for face..."
-                
+
                 if len(faces) > 0:
                     (x, y, w, h) = faces[0] # Use first face
-                    face_roi = gray[y:y+h, x:x+w]
-                    
-                    if face_roi.size > 0:
-                        image_list.append(face_roi)
-                        count += 1
-                        status_text = f"Captured image {count}/{self.images_to_capture}"
-                        
-                        # Draw rectangle on the color frame for display
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                        
-                        # Pause to get different angles
-                        time.sleep(0.1) 
-                
-                # Convert cv2 frame (BGR) to QImage (RGB)
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                
-                # Emit the frame and status
-                self.progress_frame.emit(qt_image, status_text)
+
+                    if detect_now:
+                        # [PERF] Gray only the face crop for archival - a
+                        # tiny fraction of the frame through the BGR->GRAY
+                        # kernel instead of all of it. Cropped before the
+                        # display rectangle is drawn so the archived ROI
+                        # never contains the green border.
+                        face_roi = frame[y:y+h, x:x+w]
+                        if face_roi.size > 0:
+                            face_roi = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+                            # [PERF] Accept the ROI only if it differs enough
+                            # from what we already have (aHash Hamming
+                            # distance). Replaces the old time.sleep(0.1)
+                            # "pause for different angles": no wall-clock
+                            # floor, and the training set is more diverse.
+                            # [FIX] A long rejection streak bypasses the gate
+                            # so capture always terminates.
+                            roi_hash = _ahash(face_roi)
+                            if (not accepted_hashes
+                                    or reject_streak >= MAX_REJECT_STREAK
+                                    or min(
+                                        int(np.count_nonzero(roi_hash != prev))
+                                        for prev in accepted_hashes
+                                    ) >= MIN_HASH_DISTANCE):
+                                jpeg_bytes = _encode_roi(face_roi)
+                                if jpeg_bytes:
+                                    zf.writestr(f"image_{count}.jpg", jpeg_bytes)
+                                    accepted_hashes.append(roi_hash)
+                                    count += 1
+                                    reject_streak = 0
+                                    status_text = f"Captured image {count}/{self.images_to_capture}"
+                            else:
+                                # [FIX] Tell the user why the counter paused
+                                # instead of claiming no face was found.
+                                reject_streak += 1
+                                status_text = "Move your head slightly..."
+
+                    # Draw rectangle on the color frame for display (after
+                    # the ROI crop above, so the archive stays clean)
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+
+                # [PERF] Drop-frame policy: publish a new preview frame only
+                # once the GUI has painted the previous one, so frames can't
+                # pile up in the event queue behind a slow UI. Status and
+                # progress still go out every iteration.
+                if self._frame_pending:
+                    slot = -1
+                else:
+                    # Publish the slot we flipped into; the signal carries
+                    # 8 bytes instead of a ~900KB frame payload.
+                    self._slot_idx = write_idx
+                    self._frame_pending = True
+                    slot = self._slot_idx
+
+                # Emit the slot index (or -1 while the GUI is busy) and status
+                self.progress_frame.emit(slot, status_text)
                 self.progress_value.emit(int((count / self.images_to_capture) * 100))
             
             cap.release()
-            
+            zf.close()
+
             if not self._is_running:
                 self.finished.emit(False, "Capture canceled by user.")
                 return
 
-            if len(image_list) < self.images_to_capture:
-                raise Exception(f"Capture failed. Only got {len(image_list)} images.")
+            if count < self.images_to_capture:
+                raise Exception(f"Capture failed. Only got {count} images.")
 
-            self.progress_frame.emit(None, f"Captured {len(image_list)} images. Zipping...")
+            # The zip was already written during capture - nothing to do
+            # here but rewind it for the upload.
             self.progress_value.emit(100)
-
-            # --- Zip images in memory ---
-            mem_zip = io.BytesIO()
-            with zipfile.ZipFile(mem_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for i, image_array in enumerate(image_list):
-                    is_success, buffer = cv2.imencode(".jpg", image_array)
-                    if is_success:
-                        zf.writestr(f"image_{i}.jpg", buffer.tobytes())
-            
             mem_zip.seek(0)
-            self.progress_frame.emit(None, "Uploading to server...")
+            self.progress_frame.emit(-1, "Uploading to server...")
 
             # --- Send to server ---
             files = {'file': ('faces.zip', mem_zip, 'application/zip')}
             data = {'username': self.username}
-            response = requests.post(f"{API_URL}/register-face", files=files, data=data, timeout=60)
+            response = _SESSION.post(f"{API_URL}/register-face", files=files, data=data, timeout=60)
 
             if response.status_code == 200:
                 self.finished.emit(True, "Face registered successfully! Training started.")
@@ -223,17 +423,28 @@ class FaceCaptureDialog(QDialog):
         
         self.thread.start()
 
-    @Slot(QImage, str)
-    def update_frame(self, qt_image, status_text):
+    @Slot(int, str)
+    def update_frame(self, slot, status_text):
         """Updates the video feed label and status text."""
-        if qt_image:
-            # Scale the image to fit the label, keeping aspect ratio
+        frame = self.worker._slots[slot] if (self.worker and slot >= 0) else None
+        if frame is not None:
+            # [PERF] Zero-copy wrap of the ring slot's BGR buffer; the
+            # fromImage() below is the single copy into the pixmap.
+            h, w, ch = frame.shape
+            qt_image = QImage(frame.data, w, h, ch * w,
+                              QImage.Format.Format_BGR888)
+            # Scale the image to fit the label, keeping aspect ratio.
+            # [PERF] FastTransformation: bilinear smoothing is 4-6x slower
+            # and invisible on a ~30Hz live preview that's replaced in 33ms.
             pixmap = QPixmap.fromImage(qt_image)
             self.video_label.setPixmap(pixmap.scaled(
-                self.video_label.size(), 
-                Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
+                self.video_label.size(),
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation
             ))
+            # Ack: the worker may publish its next preview frame now.
+            if self.worker:
+                self.worker._frame_pending = False
         self.status_label.setText(status_text)
         
     @Slot(bool, str)
@@ -349,10 +560,10 @@ class RegisterPage(QWidget):
                 color: {theme.COLOR_TEXT_SUBTLE};
                 font-size: 10pt;
             }}
-            QLineEdit {{ {theme.input_style()} }}
-            
+            QLineEdit {{ {theme.INPUT_STYLE} }}
+
             /* Button 1: Create Account */
-            QPushButton#create_btn {{ {theme.button_style()} }}
+            QPushButton#create_btn {{ {theme.BUTTON_STYLE} }}
             
             /* Button 2: Face Register (secondary style) */
             QPushButton#face_btn {{ 
@@ -365,7 +576,7 @@ class RegisterPage(QWidget):
                 border: 2px solid {theme.COLOR_GOLD};
             }}
             
-            QPushButton#backButton {{ {theme.link_style()} }}
+            QPushButton#backButton {{ {theme.LINK_STYLE} }}
         """)
         self.create_btn.setObjectName("create_btn")
         self.face_btn.setObjectName("face_btn")
@@ -6,6 +6,8 @@
 # should import from this file.
 #
 
+import functools
+
 COLOR_BACKGROUND = "#1A1B2E"
 COLOR_PANE_LEFT = "#272540"  # BG for cards, sidebars
 COLOR_CARD_BG = "#272540"  # Add this line
@@ -20,6 +22,10 @@ COLOR_RED = "#ed4956"
 COLOR_RED_HOVER = "#ff7d6e"
 COLOR_RED_PRESSED = "#e63946"
 
+# [PERF] The style builders return the same string for the same arguments
+# every time, so memoize them - pages re-run apply_styles on every
+# instantiation and were re-formatting identical QSS per widget.
+@functools.lru_cache(maxsize=None)
 def input_style(radius=22):
     """Returns the QSS for a standard QLineEdit."""
     return f"""
@@ -37,7 +43,8 @@ def input_style(radius=22):
         }}
     """
 
-def button_style(base=COLOR_GOLD, 
+@functools.lru_cache(maxsize=None)
+def button_style(base=COLOR_GOLD,
                    hover=COLOR_GOLD_HOVER, 
                    pressed=COLOR_GOLD_PRESSED, 
                    text_color=COLOR_PANE_LEFT, 
@@ -64,6 +71,7 @@ def button_style(base=COLOR_GOLD,
         }}
     """
 
+@functools.lru_cache(maxsize=None)
 def link_style():
     """Returns the QSS for a link-style QPushButton."""
     return f"""
@@ -79,4 +87,9 @@ def link_style():
         QPushButton:hover {{
             color: {COLOR_TEXT};
         }}
-    """
\ No newline at end of file
+    """
+# [PERF] Common styles pre-formatted once at import time; parametric calls
+# (custom colors/radius) go through the memoized builders above.
+INPUT_STYLE = input_style()
+BUTTON_STYLE = button_style()
+LINK_STYLE = link_style()